@@ -9,13 +9,14 @@ OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY must be set in environment variables")
 
+# Retries with backoff for transient errors, done by the OpenAI SDK itself
+OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '3'))
+
 # Logging Configuration
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
 # Processing Configuration
 BATCH_SIZE = int(os.getenv('BATCH_SIZE', '10'))
-API_RATE_LIMIT = int(os.getenv('API_RATE_LIMIT', '60'))
-TIME_WINDOW = int(os.getenv('TIME_WINDOW', '60'))
 
 # Template Configuration
 TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates') 
\ No newline at end of file
@@ -4,10 +4,16 @@ import asyncio
 import logging
 
 from openai import AsyncOpenAI
-from config.settings import OPENAI_API_KEY
+from config.settings import OPENAI_API_KEY, OPENAI_MAX_RETRIES
 from utils.logging_utils import setup_logging
 from processing.job_processor import process_job_site_async
 
+async def run(job_folder, output_folder):
+    # One OpenAI client (and its httpx connection pool) shared by every file,
+    # closed once the whole job is done
+    async with AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=OPENAI_MAX_RETRIES) as client:
+        await process_job_site_async(job_folder, output_folder, client)
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python main.py <input_folder> [output_folder]")
@@ -25,8 +31,5 @@ if __name__ == "__main__":
     logging.info(f"Processing files from: {job_folder}")
     logging.info(f"Output will be saved to: {output_folder}")
     
-    # 2) Create OpenAI Client
-    client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-    
-    # 3) Run asynchronous job processing
-    asyncio.run(process_job_site_async(job_folder, output_folder, client))
+    # 2) Run asynchronous job processing with a shared OpenAI client
+    asyncio.run(run(job_folder, output_folder))
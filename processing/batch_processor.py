@@ -1,38 +1,41 @@
-import time
 import asyncio
 import logging
 
+from config.settings import BATCH_SIZE
 from processing.file_processor import process_pdf_async
 from utils.constants import get_drawing_type
 
-API_RATE_LIMIT = 60  # Adjust if needed
-TIME_WINDOW = 60     # Time window to respect the rate limit
-
-async def process_batch_async(batch, client, output_folder, templates_created):
+async def process_files_async(pdf_files, client, output_folder, templates_created, on_complete=None):
     """
-    Given a batch of PDF file paths, process each one asynchronously,
-    respecting the API rate limit (API_RATE_LIMIT calls per TIME_WINDOW).
+    Process PDF file paths with a fixed pool of BATCH_SIZE workers draining a
+    bounded queue, so a slow file only holds up its own worker instead of the
+    whole batch it was started with. API pressure is bounded separately by the
+    OpenAI/Azure limits in file_processor.
+    on_complete is forwarded to each file and called as it finishes.
+    Results are returned in the same order as pdf_files.
     """
-    tasks = []
-    start_time = time.time()
+    workers = max(1, min(BATCH_SIZE, len(pdf_files)))
+    queue = asyncio.Queue(maxsize=workers * 2)
+    results = [None] * len(pdf_files)
+
+    async def produce():
+        for item in enumerate(pdf_files):
+            await queue.put(item)
+        for _ in range(workers):
+            await queue.put(None)
 
-    for index, pdf_file in enumerate(batch):
-        # Rate-limit control
-        if index > 0 and index % API_RATE_LIMIT == 0:
-            elapsed = time.time() - start_time
-            if elapsed < TIME_WINDOW:
-                await asyncio.sleep(TIME_WINDOW - elapsed)
-            start_time = time.time()
-        
-        drawing_type = get_drawing_type(pdf_file)
-        tasks.append(
-            process_pdf_async(
+    async def consume():
+        while (item := await queue.get()) is not None:
+            index, pdf_file = item
+            results[index] = await process_pdf_async(
                 pdf_path=pdf_file,
                 client=client,
                 output_folder=output_folder,
-                drawing_type=drawing_type,
-                templates_created=templates_created
+                drawing_type=get_drawing_type(pdf_file),
+                templates_created=templates_created,
+                on_complete=on_complete
             )
-        )
-    
-    return await asyncio.gather(*tasks)
+
+    logging.info("Processing %d files with %d workers", len(pdf_files), workers)
+    await asyncio.gather(produce(), *(consume() for _ in range(workers)))
+    return results
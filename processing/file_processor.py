@@ -1,12 +1,15 @@
 import os
-import json
+import asyncio
 import logging
-from tqdm.asyncio import tqdm
+import orjson
+import pymupdf
 import re
 from dotenv import load_dotenv
 
 from utils.pdf_processor import extract_text_and_tables_from_pdf
-from utils.drawing_processor import process_drawing
+from utils.drawing_processor import process_drawing, drawing_cache_key, parse_drawing_json
+from utils.cache_utils import read_json_cache, write_json_cache, write_json_file, write_bytes_atomic
+from utils.logging_utils import current_file
 from templates.room_templates import process_architectural_drawing
 from .panel_schedule_intelligence import PanelScheduleProcessor
 
@@ -17,133 +20,261 @@ load_dotenv()
 panel_processor = None
 AZURE_ENDPOINT = os.getenv("DOCUMENTINTELLIGENCE_ENDPOINT")
 AZURE_API_KEY = os.getenv("DOCUMENTINTELLIGENCE_API_KEY")
+AZURE_CONCURRENCY = int(os.getenv("AZURE_CONCURRENCY", "4"))
+AZURE_MAX_RPS = float(os.getenv("AZURE_MAX_RPS", "0")) or None
+OPENAI_CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "8"))
+PDF_CONCURRENCY = int(os.getenv("PDF_CONCURRENCY", "4"))
+PANEL_CACHE_DIR = os.getenv("PANEL_CACHE_DIR")
+PANEL_PAGES = os.getenv("PANEL_PAGES")
+GPT_CACHE_DIR = os.getenv("GPT_CACHE_DIR")
+
+# Cap in-flight work per backend across the batch: OpenAI to stay under its
+# rate limits, PDF extraction to keep peak memory bounded. Azure limits are
+# enforced by the PanelScheduleProcessor itself.
+openai_semaphore = asyncio.Semaphore(OPENAI_CONCURRENCY)
+pdf_semaphore = asyncio.Semaphore(PDF_CONCURRENCY)
 
 if AZURE_ENDPOINT and AZURE_API_KEY:
-    panel_processor = PanelScheduleProcessor(endpoint=AZURE_ENDPOINT, api_key=AZURE_API_KEY)
+    panel_processor = PanelScheduleProcessor(
+        endpoint=AZURE_ENDPOINT,
+        api_key=AZURE_API_KEY,
+        max_concurrency=AZURE_CONCURRENCY,
+        max_rps=AZURE_MAX_RPS
+    )
+
+async def close_panel_processor() -> None:
+    """
+    Release the shared Azure client's connection pool. Call once at shutdown.
+    """
+    if panel_processor:
+        await panel_processor.aclose()
+
+# "electrical panel schedule(s)" and the plural forms are covered by these substrings
+PANEL_SCHEDULE_PATTERN = re.compile(r"(?:panel|power|lighting)[- ]schedule", re.IGNORECASE)
+
+# Errors from opening or reading the PDF itself, which fail the same way on every
+# run until the file changes. PyMuPDF raises its own FileNotFoundError (a
+# RuntimeError) for a missing file; the builtins cover OS-level open failures.
+PDF_READ_ERRORS = (pymupdf.FileDataError, pymupdf.FileNotFoundError, FileNotFoundError, PermissionError)
 
-def is_panel_schedule(file_name: str, raw_content: str) -> bool:
+class UnreadablePdfError(Exception):
+    """
+    The PDF could not be opened or read; the original error is its __cause__.
+    Errors writing outputs or caches are never wrapped in this, so they stay transient.
+    """
+
+async def _read_pdf(read_func, pdf_path: str):
+    """
+    Run a blocking PyMuPDF reader in a worker thread under pdf_semaphore,
+    turning failures to read the PDF itself into UnreadablePdfError.
+    """
+    async with pdf_semaphore:
+        try:
+            return await asyncio.to_thread(read_func, pdf_path)
+        except PDF_READ_ERRORS as e:
+            raise UnreadablePdfError(str(e)) from e
+
+def _pdf_fingerprint(pdf_path: str) -> dict:
+    # ctime also moves on chmod/chown, so fixing a PermissionError clears the marker
+    stat = os.stat(pdf_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "ctime_ns": stat.st_ctime_ns}
+
+async def _read_failure_marker(marker_path: str, pdf_path: str):
+    """
+    Return the marker ({"error", "error_type"}) if pdf_path failed permanently
+    before and is unchanged since.
+    """
+    marker = await read_json_cache(marker_path)
+    if not marker:
+        return None
+    try:
+        if marker.get("pdf") != _pdf_fingerprint(pdf_path):
+            return None
+    except OSError:
+        return None
+    return marker if marker.get("error") else None
+
+async def _write_failure_marker(marker_path: str, pdf_path: str, error: Exception) -> None:
+    try:
+        fingerprint = _pdf_fingerprint(pdf_path)
+    except OSError:
+        # Nothing to compare against on the next run (e.g. the file is gone)
+        return
+    await write_json_cache(
+        marker_path, {"pdf": fingerprint, "error": str(error), "error_type": type(error).__name__}
+    )
+
+def is_panel_schedule(file_name: str) -> bool:
     """
     Determine if a PDF is likely an electrical panel schedule
     based solely on the file name (no numeric or content checks).
     
     Args:
         file_name (str): Name of the PDF file
-        raw_content (str): (Unused) Extracted text content from the PDF
         
     Returns:
-        bool: True if the file name contains certain panel-schedule keywords
+        bool: True if the file name contains a panel, power or lighting schedule
+              keyword (spaced or hyphenated)
     """
-    # We skip numeric references entirely and rely on these keywords (both spaced and hyphenated):
-    panel_keywords = [
-        "electrical panel schedule",
-        "panel schedule",
-        "panel schedules",
-        "power schedule",
-        "lighting schedule",
-        # ADDITIONAL HYPHENATED VERSIONS:
-        "electrical-panel-schedule",
-        "panel-schedule",
-        "panel-schedules",
-        "power-schedule",
-        "lighting-schedule"
-    ]
-    file_name_lower = file_name.lower()
-    
-    return any(keyword in file_name_lower for keyword in panel_keywords)
+    return PANEL_SCHEDULE_PATTERN.search(file_name) is not None
+
+# Circuit/breaker column headers (CKT, CCT, CIR, POLE, TRIP, BKR, ...) appear on every
+# panel schedule but not on e.g. lighting fixture schedules
+PANEL_TEXT_PATTERN = re.compile(
+    r"\b(?:ckts?|cct|cir(?:cuit)?s?|poles?|trip|breakers?|bkr)\b", re.IGNORECASE
+)
+PANEL_PROBE_PAGES = 2
+
+def _has_panel_text(pdf_path: str) -> bool:
+    """
+    Cheap local check of the first pages' text layer, so file names that only
+    look like panel schedules don't cost an Azure call. Scanned PDFs without a
+    text layer pass, since only Azure can read them.
+    """
+    with pymupdf.open(pdf_path) as doc:
+        text = "".join(doc[i].get_text() for i in range(min(PANEL_PROBE_PAGES, doc.page_count)))
+    return not text.strip() or PANEL_TEXT_PATTERN.search(text) is not None
 
 async def process_pdf_async(
     pdf_path,
     client,
     output_folder,
     drawing_type,
-    templates_created
+    templates_created,
+    on_complete=None
 ):
     """
     Process a single PDF asynchronously:
       1) For electrical panel schedules, use Azure Document Intelligence
       2) For other drawings, use the standard GPT pipeline
+    Output folders are expected to exist already (see process_job_site_async).
+    Unreadable PDFs leave a <name>.failed.json marker and are skipped on later runs
+    until the file changes.
+    on_complete, if given, is called once when the file finishes (success or not),
+    e.g. to advance a shared progress bar.
     """
     file_name = os.path.basename(pdf_path)
-    with tqdm(total=100, desc=f"Processing {file_name}", leave=False) as pbar:
-        try:
-            pbar.update(10)  # Start
-            raw_content = await extract_text_and_tables_from_pdf(pdf_path)
-            pbar.update(20)  # PDF text/tables extracted
+    current_file.set(file_name)
+    type_folder = os.path.join(output_folder, drawing_type)
+    marker_path = os.path.join(type_folder, os.path.splitext(file_name)[0] + '.failed.json')
+    try:
+        previous = await _read_failure_marker(marker_path, pdf_path)
+        if previous:
+            logging.warning("Skipping %s, it failed permanently on a previous run: %s", pdf_path, previous["error"])
+            return {
+                "success": False,
+                "error": previous["error"],
+                # Markers written before error_type was recorded don't have it
+                "error_type": previous.get("error_type", "PreviousFailure"),
+                "file": pdf_path,
+                "permanent": True
+            }
 
-            # Check if this is an electrical panel schedule
-            if drawing_type == "Electrical" and panel_processor and is_panel_schedule(file_name, raw_content):
-                logging.info(f"Detected electrical panel schedule in {file_name}. Using Azure Document Intelligence.")
-                
-                try:
-                    # Process with Azure Document Intelligence, now passing the GPT client
-                    panel_data = await panel_processor.process_panel_schedule(
-                        file_path=pdf_path,
-                        gpt_client=client
-                    )
-                    pbar.update(40)  # Azure processing done
-                    
-                    # Save to PanelSchedules subfolder
-                    panel_folder = os.path.join(output_folder, "PanelSchedules")
-                    os.makedirs(panel_folder, exist_ok=True)
-                    
-                    output_filename = os.path.splitext(file_name)[0] + '_panel.json'
-                    output_path = os.path.join(panel_folder, output_filename)
-                    
-                    with open(output_path, 'w') as f:
-                        json.dump(panel_data, f, indent=2)
-                    
-                    pbar.update(30)  # JSON saved
-                    logging.info(f"Successfully processed panel schedule: {output_path}")
-                    return {"success": True, "file": output_path, "panel_schedule": True}
-                    
-                except Exception as e:
-                    logging.error(f"Azure Document Intelligence processing failed for {file_name}: {str(e)}")
-                    logging.info("Falling back to standard GPT processing...")
-                    # Continue with standard processing if Azure fails
-            
-            # Standard GPT processing for non-panel schedules or fallback
-            structured_json = await process_drawing(raw_content, drawing_type, client)
-            pbar.update(40)  # GPT processing done
-            
-            type_folder = os.path.join(output_folder, drawing_type)
-            os.makedirs(type_folder, exist_ok=True)
+        # Panel schedules are detected by file name, confirmed against the first
+        # pages' text layer, and sent to Azure as-is
+        is_panel = drawing_type == "Electrical" and panel_processor and is_panel_schedule(file_name)
+        if is_panel:
+            is_panel = await _read_pdf(_has_panel_text, pdf_path)
+            if not is_panel:
+                logging.info("File name suggests a panel schedule but no circuit/breaker columns were found; using GPT")
 
-            # Attempt to parse JSON response
+        if is_panel:
+            logging.info("Detected electrical panel schedule. Using Azure Document Intelligence.")
+            
             try:
-                parsed_json = json.loads(structured_json)
-                output_filename = os.path.splitext(file_name)[0] + '_structured.json'
-                output_path = os.path.join(type_folder, output_filename)
+                cache_dir = PANEL_CACHE_DIR or os.path.join(output_folder, ".azure_cache")
+                panel_data = await panel_processor.process_panel_schedule(
+                    pdf_path, cache_dir=cache_dir, pages=PANEL_PAGES
+                )
+                if panel_data.get("error"):
+                    raise RuntimeError(panel_data["error"])
                 
-                with open(output_path, 'w') as f:
-                    json.dump(parsed_json, f, indent=2)
+                # Save to PanelSchedules subfolder
+                panel_folder = os.path.join(output_folder, "PanelSchedules")
                 
-                pbar.update(20)  # JSON saved
-                logging.info(f"Successfully processed and saved: {output_path}")
+                output_filename = os.path.splitext(file_name)[0] + '_panel.json'
+                output_path = os.path.join(panel_folder, output_filename)
                 
-                # If Architectural, generate room templates
-                if drawing_type == 'Architectural':
-                    result = process_architectural_drawing(parsed_json, pdf_path, type_folder)
-                    templates_created['floor_plan'] = True
-                    logging.info(f"Created room templates: {result}")
+                await write_json_file(output_path, panel_data)
                 
-                pbar.update(10)  # Finishing
-                return {"success": True, "file": output_path, "panel_schedule": False}
-            
-            except json.JSONDecodeError as e:
-                pbar.update(100)
-                logging.error(f"JSON parsing error for {pdf_path}: {str(e)}")
-                logging.info(f"Raw API response: {structured_json}")
+                logging.info("Successfully processed panel schedule: %s", output_path)
+                return {"success": True, "file": output_path, "panel_schedule": True}
+                
+            except Exception as e:
+                logging.error("Azure Document Intelligence processing failed: %s", e)
+                logging.info("Falling back to standard GPT processing...")
+                # Continue with standard processing if Azure fails
+        
+        raw_content = await _read_pdf(extract_text_and_tables_from_pdf, pdf_path)
+        logging.debug("Extracted text/tables")
+
+        # Standard GPT processing for non-panel schedules or fallback,
+        # skipped when this exact content was already structured
+        gpt_cache_dir = GPT_CACHE_DIR or os.path.join(output_folder, ".gpt_cache")
+        cache_path = os.path.join(gpt_cache_dir, f"{drawing_cache_key(raw_content, drawing_type)}.json")
+        parsed_json = await read_json_cache(cache_path)
+
+        if parsed_json is not None:
+            logging.info("Using cached GPT result")
+        else:
+            async with openai_semaphore:
+                structured_json = await process_drawing(raw_content, drawing_type, client)
+            logging.debug("GPT processing done")
+
+            # Attempt to parse JSON response
+            try:
+                parsed_json = parse_drawing_json(structured_json)
+            except orjson.JSONDecodeError as e:
+                logging.error("JSON parsing error for %s: %s", pdf_path, e)
+                logging.info("Raw API response: %s", structured_json)
                 
                 raw_output_filename = os.path.splitext(file_name)[0] + '_raw_response.json'
                 raw_output_path = os.path.join(type_folder, raw_output_filename)
                 
-                with open(raw_output_path, 'w') as f:
-                    f.write(structured_json)
+                await write_bytes_atomic(raw_output_path, structured_json.encode())
                 
-                logging.warning(f"Saved raw API response to {raw_output_path}")
-                return {"success": False, "error": "Failed to parse JSON", "file": pdf_path}
+                logging.warning("Saved raw API response to %s", raw_output_path)
+                return {"success": False, "error": "Failed to parse JSON", "error_type": type(e).__name__, "file": pdf_path}
+
+            await write_json_cache(cache_path, parsed_json)
+
+        output_filename = os.path.splitext(file_name)[0] + '_structured.json'
+        output_path = os.path.join(type_folder, output_filename)
+        
+        await write_json_file(output_path, parsed_json)
         
-        except Exception as e:
-            pbar.update(100)
-            logging.error(f"Error processing {pdf_path}: {str(e)}")
-            return {"success": False, "error": str(e), "file": pdf_path}
+        logging.info("Successfully processed and saved: %s", output_path)
+        
+        # If Architectural, generate room templates
+        if drawing_type == 'Architectural':
+            # Small and mostly file writes; a worker thread keeps them off the event loop
+            result = await asyncio.to_thread(
+                process_architectural_drawing, parsed_json, pdf_path, type_folder
+            )
+            templates_created['floor_plan'] = True
+            logging.info("Created room templates: %s", result)
+        
+        return {"success": True, "file": output_path, "panel_schedule": False}
+    
+    except UnreadablePdfError as e:
+        read_error = e.__cause__
+        logging.error("Permanent failure processing %s: %s", pdf_path, read_error)
+        try:
+            await _write_failure_marker(marker_path, pdf_path, read_error)
+        except OSError as marker_error:
+            # e.g. the output folder itself is unwritable; report the file, don't abort the job
+            logging.warning("Could not write failure marker %s: %s", marker_path, marker_error)
+        return {
+            "success": False,
+            "error": str(read_error),
+            "error_type": type(read_error).__name__,
+            "file": pdf_path,
+            "permanent": True
+        }
+
+    except Exception as e:
+        logging.error("Error processing %s: %s", pdf_path, e)
+        return {"success": False, "error": str(e), "error_type": type(e).__name__, "file": pdf_path}
+    finally:
+        if on_complete:
+            on_complete()
@@ -1,10 +1,14 @@
 import os
 import logging
 import asyncio
+import orjson
 from tqdm.asyncio import tqdm
 
 from utils.file_utils import traverse_job_folder
-from processing.batch_processor import process_batch_async
+from utils.constants import get_drawing_type
+from processing.batch_processor import process_files_async
+from processing.file_processor import close_panel_processor
+from utils.cache_utils import write_bytes_atomic
 
 async def process_job_site_async(job_folder, output_folder, client):
     """
@@ -14,39 +18,38 @@ async def process_job_site_async(job_folder, output_folder, client):
         os.makedirs(output_folder)
     
     pdf_files = traverse_job_folder(job_folder)
-    logging.info(f"Found {len(pdf_files)} PDF files in {job_folder}")
+    logging.info("Found %d PDF files in %s", len(pdf_files), job_folder)
     
     if not pdf_files:
         logging.warning("No PDF files found. Please check the input folder.")
         return
     
+    # Create every output folder up front instead of once per PDF
+    for drawing_type in {get_drawing_type(pdf_file) for pdf_file in pdf_files}:
+        os.makedirs(os.path.join(output_folder, drawing_type), exist_ok=True)
+    os.makedirs(os.path.join(output_folder, "PanelSchedules"), exist_ok=True)
+    
     templates_created = {"floor_plan": False}
-    batch_size = 10
-    total_batches = (len(pdf_files) + batch_size - 1) // batch_size
     
-    all_results = []
-    with tqdm(total=len(pdf_files), desc="Overall Progress") as overall_pbar:
-        for i in range(0, len(pdf_files), batch_size):
-            batch = pdf_files[i:i+batch_size]
-            logging.info(f"Processing batch {i//batch_size + 1} of {total_batches}")
-            
-            batch_results = await process_batch_async(batch, client, output_folder, templates_created)
-            all_results.extend(batch_results)
-            
-            successes = [r for r in batch_results if r['success']]
-            failures = [r for r in batch_results if not r['success']]
-            
-            overall_pbar.update(len(batch))
-            logging.info(f"Batch completed. Successes: {len(successes)}, Failures: {len(failures)}")
-            
-            for failure in failures:
-                logging.error(f"Failed to process {failure['file']}: {failure['error']}")
+    try:
+        with tqdm(total=len(pdf_files), desc="Overall Progress") as overall_pbar:
+            all_results = await process_files_async(
+                pdf_files, client, output_folder, templates_created,
+                on_complete=lambda: overall_pbar.update(1)
+            )
+    finally:
+        await close_panel_processor()
 
     successes = [r for r in all_results if r['success']]
     failures = [r for r in all_results if not r['success']]
     
-    logging.info(f"Processing complete. Total successes: {len(successes)}, Total failures: {len(failures)}")
+    logging.info("Processing complete. Total successes: %d, Total failures: %d", len(successes), len(failures))
     if failures:
         logging.warning("Failures:")
         for failure in failures:
-            logging.warning(f"  {failure['file']}: {failure['error']}")
+            logging.warning("  %s: %s", failure['file'], failure['error'])
+
+    # One JSON line per failed file, so a rerun or retry script can pick them up;
+    # rewritten on every run so it never lists failures from an earlier one
+    failures_path = os.path.join(output_folder, "failures.jsonl")
+    await write_bytes_atomic(failures_path, b"".join(orjson.dumps(failure) + b"\n" for failure in failures))
@@ -1,11 +1,18 @@
+import asyncio
+import hashlib
 import logging
 import os
-import json
-from typing import Dict
+from typing import Dict, List, Optional
 
+import aiofiles
+import aiohttp
 from azure.core.credentials import AzureKeyCredential
-from azure.ai.documentintelligence import DocumentIntelligenceClient
-from azure.ai.documentintelligence.models import DocumentAnalysisFeature
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.ai.documentintelligence import __version__ as DI_SDK_VERSION
+from azure.ai.documentintelligence.aio import DocumentIntelligenceClient
+from azure.ai.documentintelligence.models import AnalyzeDocumentRequest, DocumentAnalysisFeature
+
+from utils.cache_utils import read_json_cache, write_json_cache
 
 class PanelScheduleProcessor:
     """
@@ -13,17 +20,169 @@ class PanelScheduleProcessor:
     It automatically extracts layout info using the 'prebuilt-layout' model.
     """
 
-    def __init__(self, endpoint: str, api_key: str, **kwargs):
-        self.client = DocumentIntelligenceClient(
-            endpoint=endpoint,
-            credential=AzureKeyCredential(api_key)
-        )
+    MODEL_ID = "prebuilt-layout"
+    READ_CHUNK_SIZE = 1024 * 1024
+    # Passed to azure-core's retry policy, which already retries 408/429/5xx
+    # and honours Retry-After; there is no second retry loop on top of it
+    MAX_RETRIES = 3
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: str,
+        connection_limit: int = 32,
+        max_concurrency: int = 4,
+        max_rps: Optional[float] = None,
+        cache_dir: Optional[str] = None,
+        **kwargs
+    ):
+        self.endpoint = endpoint
+        self.credential = AzureKeyCredential(api_key)
+        self.connection_limit = connection_limit
+        self.max_rps = max_rps
+        # Default result cache location, used when a call doesn't pass its own
+        self.cache_dir = cache_dir
+        self._client = None
+        # Bounds in-flight analyses; max_rps additionally spaces out submissions
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._next_slot = 0.0
         self.logger = logging.getLogger(__name__)
 
-    def process_panel_schedule(self, file_path: str) -> Dict:
+    @property
+    def client(self) -> DocumentIntelligenceClient:
+        """
+        Lazily builds one client on a pooled aiohttp session. The session has to
+        be created inside the running event loop, so this cannot happen in __init__.
+        """
+        if self._client is None:
+            # Same session settings azure-core's default transport uses (proxy
+            # env vars honoured, no cookies, the pipeline handles decompression),
+            # only with a larger connection pool
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.connection_limit,
+                    limit_per_host=self.connection_limit
+                ),
+                trust_env=True,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                auto_decompress=False
+            )
+            self._client = DocumentIntelligenceClient(
+                endpoint=self.endpoint,
+                credential=self.credential,
+                transport=AioHttpTransport(session=session, session_owner=True),
+                retry_total=self.MAX_RETRIES
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """
+        Close the client and its connection pool. Safe to call more than once.
+        """
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def _acquire_rps(self) -> None:
+        """
+        Token-bucket style pacing: each caller reserves the next free slot
+        1/max_rps seconds after the previous one and sleeps until it.
+        """
+        if not self.max_rps:
+            return
+        now = asyncio.get_running_loop().time()
+        slot = max(self._next_slot, now)
+        self._next_slot = slot + 1 / self.max_rps
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _analyze(self, file_path: str, blob_url: Optional[str] = None, pages: Optional[str] = None):
+        """
+        Submit one document to Azure and wait for the analyze result,
+        within the concurrency and rate limits. pages (e.g. "1-3") restricts
+        analysis to those pages. Transient failures are retried by the client.
+        """
+        features = [DocumentAnalysisFeature.KEY_VALUE_PAIRS]
+        async with self._semaphore:
+            await self._acquire_rps()
+            if blob_url:
+                poller = await self.client.begin_analyze_document(
+                    model_id=self.MODEL_ID,
+                    body=AnalyzeDocumentRequest(url_source=blob_url),
+                    features=features,
+                    pages=pages
+                )
+            else:
+                # The transport uploads the file stream in chunks rather than one buffer
+                with open(file_path, "rb") as f:
+                    poller = await self.client.begin_analyze_document(
+                        model_id=self.MODEL_ID,
+                        body=f,
+                        features=features,
+                        pages=pages
+                    )
+            return await poller.result()
+
+    async def _cache_key(self, file_path: str, pages: Optional[str] = None) -> str:
+        """
+        Content hash of the PDF, salted with the model, SDK version and page
+        range so that changing any of them invalidates previously cached results.
+        The file is hashed in chunks so it is never held in memory as a whole.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{self.MODEL_ID}\0{DI_SDK_VERSION}\0{pages or ''}\0".encode())
+        async with aiofiles.open(file_path, "rb") as f:
+            while chunk := await f.read(self.READ_CHUNK_SIZE):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @staticmethod
+    def _table_to_rows(table) -> List[List[str]]:
+        """
+        Build a 2D list (rows, columns) in a single pass over the cells,
+        placing each one directly at its (row_index, column_index).
+        """
+        table_rows = [[""] * table.column_count for _ in range(table.row_count)]
+        for cell in table.cells:
+            table_rows[cell.row_index][cell.column_index] = cell.content
+        return table_rows
+
+    def _extract_tables(self, result) -> List[Dict]:
+        """
+        Convert every table in an analyze result into a rows/columns dictionary.
         """
-        1) Opens the PDF file
-        2) Analyzes with the 'prebuilt-layout' model
+        tables_data = []
+        if hasattr(result, "tables") and result.tables:
+            self.logger.info("Found %d table(s) in document.", len(result.tables))
+            debug = self.logger.isEnabledFor(logging.DEBUG)
+            for table_idx, table in enumerate(result.tables):
+                if debug:
+                    self.logger.debug(
+                        "Table %d: %d rows x %d columns", table_idx, table.row_count, table.column_count
+                    )
+
+                table_rows = self._table_to_rows(table)
+
+                tables_data.append({
+                    "table_index": table_idx,
+                    "row_count": table.row_count,
+                    "column_count": table.column_count,
+                    "rows": table_rows
+                })
+        return tables_data
+
+    async def process_panel_schedule(
+        self,
+        file_path: str,
+        cache_dir: Optional[str] = None,
+        blob_url: Optional[str] = None,
+        pages: Optional[str] = None
+    ) -> Dict:
+        """
+        1) Returns the cached result from cache_dir if this PDF was seen before
+        2) Otherwise sends the PDF to the 'prebuilt-layout' model: by URL when
+           blob_url points at a copy Azure can read directly (no upload),
+           else by streaming the local file; only the given pages if set
         3) Pulls out table data
         4) Returns a JSON-like dictionary
         """
@@ -35,49 +194,22 @@ class PanelScheduleProcessor:
         }
 
         try:
-            self.logger.info(f"Processing panel schedule: {file_path}")
-
-            # Direct file stream handling (2024-11-30 recommended approach)
-            with open(file_path, "rb") as f:
-                poller = self.client.begin_analyze_document(
-                    model_id="prebuilt-layout",
-                    body=f,  # Pass file stream directly
-                    features=[
-                        DocumentAnalysisFeature.KEY_VALUE_PAIRS
-                    ]
-                )
+            self.logger.info("Processing panel schedule: %s", file_path)
 
-            result = poller.result()
+            cache_dir = cache_dir or self.cache_dir
+            cache_path = None
+            if cache_dir and os.path.exists(file_path):
+                cache_path = os.path.join(cache_dir, f"{await self._cache_key(file_path, pages)}.json")
+                cached = await read_json_cache(cache_path)
+                if cached is not None:
+                    self.logger.info("Using cached Azure result for %s", file_path)
+                    cached["file_name"] = os.path.basename(file_path)
+                    return cached
 
-            # Extract table data
-            tables_data = []
-            if hasattr(result, "tables") and result.tables:
-                self.logger.info(f"Found {len(result.tables)} table(s) in document.")
-                for table_idx, table in enumerate(result.tables):
-                    self.logger.debug(
-                        f"Table {table_idx}: {table.row_count} rows x {table.column_count} columns"
-                    )
+            result = await self._analyze(file_path, blob_url, pages)
 
-                    # Build a 2D list (rows, columns)
-                    table_rows = []
-                    for cell in table.cells:
-                        # Make sure the list is big enough for this row
-                        while len(table_rows) <= cell.row_index:
-                            table_rows.append([])
-
-                        row = table_rows[cell.row_index]
-                        # Pad columns if needed
-                        while len(row) < cell.column_index:
-                            row.append("")
-                        # Insert or overwrite the cell content
-                        row.insert(cell.column_index, cell.content)
-
-                    tables_data.append({
-                        "table_index": table_idx,
-                        "row_count": table.row_count,
-                        "column_count": table.column_count,
-                        "rows": table_rows
-                    })
+            # Table post-processing is pure CPU work, keep it off the event loop
+            tables_data = await asyncio.to_thread(self._extract_tables, result)
 
             # Build final JSON-like output (tables only)
             final_result = {
@@ -85,9 +217,27 @@ class PanelScheduleProcessor:
                 "extracted_tables": tables_data
             }
 
+            if cache_path:
+                await write_json_cache(cache_path, final_result)
+
             return final_result
 
         except Exception as e:
-            self.logger.exception(f"Failed to process panel schedule: {e}")
+            self.logger.exception("Failed to process panel schedule: %s", e)
             fallback_output["error"] = str(e)
-            return fallback_output
\ No newline at end of file
+            return fallback_output
+
+    async def process_batch(
+        self,
+        file_paths: List[str],
+        cache_dir: Optional[str] = None,
+        pages: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Analyze several panel schedules concurrently over the shared client,
+        within the processor's concurrency and rate limits.
+        Results are returned in the same order as file_paths.
+        """
+        return await asyncio.gather(
+            *(self.process_panel_schedule(p, cache_dir=cache_dir, pages=pages) for p in file_paths)
+        )
@@ -1,5 +1,8 @@
 import json
 import os
+import orjson
+
+from utils.cache_utils import write_bytes_atomic_sync
 
 def load_template(template_name):
     current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -68,10 +71,8 @@ def process_architectural_drawing(parsed_data, file_path, output_folder):
     e_rooms_file = os.path.join(output_folder, f'e_rooms_details_floor_{floor_number}.json')
     a_rooms_file = os.path.join(output_folder, f'a_rooms_details_floor_{floor_number}.json')
     
-    with open(e_rooms_file, 'w') as f:
-        json.dump(e_rooms_data, f, indent=2)
-    with open(a_rooms_file, 'w') as f:
-        json.dump(a_rooms_data, f, indent=2)
+    write_bytes_atomic_sync(e_rooms_file, orjson.dumps(e_rooms_data, option=orjson.OPT_INDENT_2))
+    write_bytes_atomic_sync(a_rooms_file, orjson.dumps(a_rooms_data, option=orjson.OPT_INDENT_2))
     
     return {
         "e_rooms_file": e_rooms_file,
@@ -1,72 +1,110 @@
 import os
 import sys
-import json
 import logging
 import asyncio
 
-from dotenv import load_dotenv
 from processing.panel_schedule_intelligence import PanelScheduleProcessor
-from processing.file_processor import is_panel_schedule
+from processing.file_processor import (
+    is_panel_schedule, AZURE_ENDPOINT, AZURE_API_KEY, AZURE_CONCURRENCY, AZURE_MAX_RPS
+)
+from utils.file_utils import traverse_job_folder
+from utils.cache_utils import read_json_cache, write_json_file
+from utils.logging_utils import setup_queue_logging
 
 def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s'
-    )
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    setup_queue_logging(handler)
+
+def output_path_for(output_folder, pdf_path):
+    file_name = os.path.basename(pdf_path)
+    return os.path.join(output_folder, f"{os.path.splitext(file_name)[0]}_test_panel.json")
+
+async def has_fresh_output(out_file, pdf_path):
+    """
+    True if out_file is a successful result written after pdf_path last changed.
+    """
+    try:
+        if os.path.getmtime(out_file) < os.path.getmtime(pdf_path):
+            return False
+    except OSError:
+        return False
+    previous = await read_json_cache(out_file)
+    return previous is not None and not previous.get("error")
 
 async def main():
-    if len(sys.argv) < 2:
-        print("Usage: python test_azure_panel.py <pdf_file_or_folder>")
+    flags = {a for a in sys.argv[1:] if a.startswith("--")}
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    use_cache = "--no-cache" not in flags
+    # --no-cache means "analyse everything again", so it also bypasses the output freshness check
+    force = "--force" in flags or not use_cache
+    if not args:
+        print("Usage: python test_azure_panel.py <pdf_file_or_folder> [--no-cache] [--force]")
         sys.exit(1)
 
-    path_arg = sys.argv[1]
+    path_arg = args[0]
     if not os.path.exists(path_arg):
         print(f"Error: Path '{path_arg}' does not exist.")
         sys.exit(1)
 
-    load_dotenv()
-    endpoint = os.getenv("DOCUMENTINTELLIGENCE_ENDPOINT")
-    api_key = os.getenv("DOCUMENTINTELLIGENCE_API_KEY")
-
-    if not endpoint or not api_key:
-        logging.error("Azure Document Intelligence credentials not found in environment.")
+    # Resolved once when file_processor loaded the .env file
+    if not AZURE_ENDPOINT or not AZURE_API_KEY:
+        print("Error: DOCUMENTINTELLIGENCE_ENDPOINT and DOCUMENTINTELLIGENCE_API_KEY must be set.")
         sys.exit(1)
 
-    panel_processor = PanelScheduleProcessor(endpoint=endpoint, api_key=api_key)
-
     pdf_files = []
     if os.path.isfile(path_arg) and path_arg.lower().endswith(".pdf"):
         pdf_files.append(path_arg)
     elif os.path.isdir(path_arg):
-        for root, _, files in os.walk(path_arg):
-            for f in files:
-                if f.lower().endswith(".pdf"):
-                    pdf_files.append(os.path.join(root, f))
+        pdf_files = traverse_job_folder(path_arg)
 
     output_folder = os.path.join(os.getcwd(), "test_output")
     os.makedirs(output_folder, exist_ok=True)
 
-    for pdf_path in pdf_files:
-        file_name = os.path.basename(pdf_path)
-        if is_panel_schedule(file_name, ""):
-            logging.info(f"Detected panel schedule in '{file_name}'...")
+    panel_processor = PanelScheduleProcessor(
+        endpoint=AZURE_ENDPOINT,
+        api_key=AZURE_API_KEY,
+        cache_dir=os.path.join(output_folder, ".azure_cache") if use_cache else None,
+        max_concurrency=AZURE_CONCURRENCY,
+        max_rps=AZURE_MAX_RPS
+    )
+
+    # Partition by file name up front so only panel schedules are dispatched
+    panel_files = [p for p in pdf_files if is_panel_schedule(os.path.basename(p))]
+    logging.info(
+        "Detected %d panel schedule(s); skipping %d other PDF(s).",
+        len(panel_files), len(pdf_files) - len(panel_files)
+    )
+
+    # Skip PDFs whose output from an earlier run is still current, unless forced
+    if not force:
+        fresh = [await has_fresh_output(output_path_for(output_folder, p), p) for p in panel_files]
+        skipped = sum(fresh)
+        panel_files = [p for p, is_fresh in zip(panel_files, fresh) if not is_fresh]
+        if skipped:
+            logging.info("Skipping %d panel schedule(s) with up-to-date output (use --force or --no-cache to redo).", skipped)
+
+    try:
+        # Analyze all panel schedules concurrently, bounded by the processor's limits.
+        # process_panel_schedule returns an error result instead of raising, so one
+        # failing PDF never cancels the others.
+        results = await panel_processor.process_batch(panel_files)
+
+        for pdf_path, result_data in zip(panel_files, results):
+            file_name = os.path.basename(pdf_path)
+            if result_data.get("error"):
+                logging.error("Error processing '%s': %s", file_name, result_data['error'])
+            else:
+                logging.info("Successfully processed '%s'.", file_name)
+
+            out_file = output_path_for(output_folder, pdf_path)
             try:
-                # Now calls the panel processor's method WITHOUT GPT
-                result_data = panel_processor.process_panel_schedule(pdf_path)
-                logging.info(f"Successfully processed '{file_name}'.")
-            except Exception as e:
-                logging.exception(f"Error: {e}")
-                result_data = {"extracted_chunks": [], "error": str(e)}
-
-            out_file = os.path.join(
-                output_folder,
-                f"{os.path.splitext(file_name)[0]}_test_panel.json"
-            )
-            with open(out_file, "w") as f:
-                json.dump(result_data, f, indent=2)
-            logging.info(f"Wrote output to '{out_file}'")
-        else:
-            logging.info(f"'{file_name}' does NOT appear to be a panel schedule.")
+                await write_json_file(out_file, result_data)
+                logging.info("Wrote output to '%s'", out_file)
+            except OSError as e:
+                logging.error("Could not write output for '%s': %s", file_name, e)
+    finally:
+        await panel_processor.aclose()
 
 
 if __name__ == "__main__":
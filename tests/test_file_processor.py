@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+import pymupdf
+
+from processing.file_processor import PANEL_TEXT_PATTERN, _has_panel_text
+
+def write_pdf(path, text):
+    with pymupdf.open() as doc:
+        page = doc.new_page()
+        if text:
+            page.insert_text((72, 72), text)
+        doc.save(path)
+
+class PanelTextPatternTest(unittest.TestCase):
+    def test_matches_panel_schedule_column_headers(self):
+        for header in ("CKT", "CKTS", "CCT NO.", "CIR", "CIRCUIT", "Circuits",
+                       "POLE", "POLES", "TRIP", "BKR", "BREAKER", "Breakers"):
+            with self.subTest(header=header):
+                self.assertIsNotNone(PANEL_TEXT_PATTERN.search(f"NO. {header} LOAD DESCRIPTION"))
+
+    def test_ignores_other_schedules(self):
+        for text in ("TYPE  MANUFACTURER  LAMPS  VOLTAGE  MOUNTING",
+                     "circuitry", "tripod", "DOOR SCHEDULE"):
+            with self.subTest(text=text):
+                self.assertIsNone(PANEL_TEXT_PATTERN.search(text))
+
+class HasPanelTextTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _pdf(self, text):
+        path = os.path.join(self._tmp.name, "E601 Panel Schedule.pdf")
+        write_pdf(path, text)
+        return path
+
+    def test_accepts_schedule_without_the_word_circuit(self):
+        self.assertTrue(_has_panel_text(self._pdf("PANEL LP-1   CCT  LOAD  POLE  TRIP  BKR")))
+
+    def test_rejects_lighting_fixture_schedule(self):
+        self.assertFalse(_has_panel_text(self._pdf("LIGHTING FIXTURE SCHEDULE  TYPE  LAMPS  VOLTAGE")))
+
+    def test_accepts_scanned_pdf_without_text_layer(self):
+        self.assertTrue(_has_panel_text(self._pdf("")))
+
+if __name__ == "__main__":
+    unittest.main()
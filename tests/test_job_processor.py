@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+import httpx
+import openai
+import orjson
+import pymupdf
+
+from processing.job_processor import process_job_site_async
+
+OPENAI_URL = "https://api.openai.com/v1/chat/completions"
+
+class FailingCompletions:
+    def __init__(self, error):
+        self.error = error
+
+    async def create(self, *args, **kwargs):
+        raise self.error
+
+class FailingClient:
+    """
+    Stand-in for AsyncOpenAI whose chat completions always raise the given error,
+    as the real client does once its own retries are exhausted.
+    """
+    def __init__(self, error):
+        self.chat = type("Chat", (), {"completions": FailingCompletions(error)})()
+
+def api_error(error_class, status_code, message):
+    response = httpx.Response(status_code, request=httpx.Request("POST", OPENAI_URL))
+    return error_class(message, response=response, body=None)
+
+class FailuresJsonlTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.job_folder = os.path.join(self._tmp.name, "job")
+        self.output_folder = os.path.join(self._tmp.name, "output")
+        os.makedirs(self.job_folder)
+
+        # A readable mechanical drawing, so the failure can only come from the GPT call
+        with pymupdf.open() as doc:
+            doc.new_page().insert_text((72, 72), "M101 MECHANICAL PLAN")
+            doc.save(os.path.join(self.job_folder, "M101 Mechanical Plan.pdf"))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    async def _run_and_read_failures(self, error):
+        await process_job_site_async(self.job_folder, self.output_folder, FailingClient(error))
+        with open(os.path.join(self.output_folder, "failures.jsonl"), "rb") as f:
+            return [orjson.loads(line) for line in f.read().splitlines()]
+
+    async def test_rate_limit_error_keeps_its_type(self):
+        error = api_error(openai.RateLimitError, 429, "Rate limit reached for gpt-4o-mini")
+
+        failures = await self._run_and_read_failures(error)
+
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0]["error_type"], "RateLimitError")
+        self.assertIn("Rate limit reached", failures[0]["error"])
+        self.assertNotIn("permanent", failures[0])
+
+    async def test_api_status_error_keeps_its_type(self):
+        error = api_error(openai.BadRequestError, 400, "Invalid value for 'max_tokens'")
+
+        failures = await self._run_and_read_failures(error)
+
+        self.assertEqual(len(failures), 1)
+        self.assertEqual(failures[0]["error_type"], "BadRequestError")
+        self.assertIn("max_tokens", failures[0]["error"])
+
+if __name__ == "__main__":
+    unittest.main()
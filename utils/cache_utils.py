@@ -0,0 +1,66 @@
+import os
+import uuid
+import contextlib
+import logging
+from typing import Any, Optional
+
+import aiofiles
+import orjson
+
+logger = logging.getLogger(__name__)
+
+async def read_json_cache(cache_path: str) -> Optional[Any]:
+    """
+    Load a cached JSON entry. Returns None if it is missing or corrupt.
+    """
+    try:
+        async with aiofiles.open(cache_path, "rb") as f:
+            return orjson.loads(await f.read())
+    except FileNotFoundError:
+        return None
+    except orjson.JSONDecodeError:
+        logger.warning("Ignoring corrupt cache entry: %s", cache_path)
+        return None
+
+async def write_bytes_atomic(path: str, payload: bytes) -> None:
+    """
+    Write payload to a temporary file next to path and rename it into place,
+    so a crash, Ctrl-C or concurrent reader never sees a partial file.
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        async with aiofiles.open(tmp_path, "wb") as f:
+            await f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+def write_bytes_atomic_sync(path: str, payload: bytes) -> None:
+    """
+    Blocking counterpart of write_bytes_atomic, for code that already runs
+    off the event loop (worker threads, scripts).
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+async def write_json_file(path: str, data: Any) -> None:
+    """
+    Atomically write data as indented JSON, for output files meant to be read.
+    """
+    await write_bytes_atomic(path, orjson.dumps(data, option=orjson.OPT_INDENT_2))
+
+async def write_json_cache(cache_path: str, data: Any) -> None:
+    """
+    Persist a JSON cache entry atomically, creating the cache folder if needed.
+    """
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    await write_bytes_atomic(cache_path, orjson.dumps(data))
@@ -1,5 +1,16 @@
+import re
+import hashlib
+
+import orjson
 from openai import AsyncOpenAI
 
+GPT_MODEL = "gpt-4o-mini"
+# Bump whenever the prompt below changes so cached GPT results are invalidated
+PROMPT_VERSION = 1
+
+# Outermost {...} span, used to recover JSON wrapped in code fences or prose
+JSON_OBJECT_PATTERN = re.compile(r"\{.*\}", re.DOTALL)
+
 DRAWING_INSTRUCTIONS = {
     "Electrical": "Focus on panel schedules, circuit info, equipment schedules with electrical characteristics, and installation notes.",
     "Mechanical": "Capture equipment schedules, HVAC details (CFM, capacities), and installation instructions.",
@@ -20,6 +31,27 @@ DRAWING_INSTRUCTIONS = {
     "General": "Organize all relevant data into logical categories based on content type."
 }
 
+def drawing_cache_key(raw_content: str, drawing_type: str) -> str:
+    """
+    Content hash identifying a GPT result for this drawing text, type, model and prompt version.
+    """
+    h = hashlib.blake2b(f"{drawing_type}\0{GPT_MODEL}\0{PROMPT_VERSION}\0".encode(), digest_size=16)
+    h.update(raw_content.encode())
+    return h.hexdigest()
+
+def parse_drawing_json(content: str):
+    """
+    Parse GPT output as JSON, tolerating a code fence or stray text around the object.
+    Raises orjson.JSONDecodeError if no valid object can be recovered.
+    """
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        match = JSON_OBJECT_PATTERN.search(content)
+        if not match:
+            raise
+        return orjson.loads(match.group(0))
+
 async def process_drawing(raw_content: str, drawing_type: str, client: AsyncOpenAI):
     """
     Use GPT to parse PDF text + table data into structured JSON
@@ -38,8 +70,9 @@ async def process_drawing(raw_content: str, drawing_type: str, client: AsyncOpen
     """
     
     try:
+        # Retries (408/409/429/5xx, with backoff) are configured once on the client
         response = await client.chat.completions.create(
-            model="gpt-4o-mini",
+            model=GPT_MODEL,
             messages=[
                 {"role": "system", "content": system_message},
                 {"role": "user", "content": raw_content}
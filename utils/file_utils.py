@@ -1,22 +1,34 @@
 import os
 import logging
-from typing import List
+from typing import Iterator, List
 
 logger = logging.getLogger(__name__)
 
+def _iter_pdf_files(folder: str) -> Iterator[str]:
+    """
+    Recursively yield PDF paths under folder using os.scandir, which reuses the
+    directory entry type info instead of stat-ing every file.
+    """
+    try:
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from _iter_pdf_files(entry.path)
+                elif entry.name.lower().endswith('.pdf'):
+                    yield entry.path
+    except OSError as e:
+        logger.warning("Skipping unreadable folder %s: %s", folder, e)
+
 def traverse_job_folder(job_folder: str) -> List[str]:
     """
     Traverse the job folder and collect all PDF files.
     """
     pdf_files = []
     try:
-        for root, _, files in os.walk(job_folder):
-            for file in files:
-                if file.lower().endswith('.pdf'):
-                    pdf_files.append(os.path.join(root, file))
-        logger.info(f"Found {len(pdf_files)} PDF files in {job_folder}")
+        pdf_files.extend(_iter_pdf_files(job_folder))
+        logger.info("Found %d PDF files in %s", len(pdf_files), job_folder)
     except Exception as e:
-        logger.error(f"Error traversing job folder {job_folder}: {str(e)}")
+        logger.error("Error traversing job folder %s: %s", job_folder, e)
     return pdf_files
 
 def cleanup_temporary_files(output_folder: str) -> None:
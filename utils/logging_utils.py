@@ -1,11 +1,44 @@
 import os
+import queue
+import atexit
 import logging
+import logging.handlers
+import contextvars
 from datetime import datetime
 
+# Name of the PDF the current task is working on; set once per file so
+# log calls don't have to format it into every message
+current_file = contextvars.ContextVar("current_file", default="-")
+
+class FileContextFilter(logging.Filter):
+    """
+    Stamps each record with the current_file context variable as %(file_name)s.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.file_name = current_file.get()
+        return True
+
+def setup_queue_logging(handler: logging.Handler, level: int = logging.INFO) -> None:
+    """
+    Route root logging through a QueueHandler, with a QueueListener thread
+    feeding handler, so logging never blocks the event loop on I/O.
+    """
+    # The filter runs on the queue side, in the task that logged the record,
+    # so current_file still holds that task's file name
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    queue_handler.addFilter(FileContextFilter())
+    listener = logging.handlers.QueueListener(queue_handler.queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    logging.basicConfig(level=level, handlers=[queue_handler])
+
 def setup_logging(output_folder: str) -> None:
     """
     Configure and initialize logging for the application.
-    Creates a 'logs' folder in the output directory.
+    Creates a 'logs' folder in the output directory, written through
+    setup_queue_logging.
     """
     log_folder = os.path.join(output_folder, 'logs')
     os.makedirs(log_folder, exist_ok=True)
@@ -13,9 +46,9 @@ def setup_logging(output_folder: str) -> None:
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_file = os.path.join(log_folder, f"process_log_{timestamp}.txt")
     
-    logging.basicConfig(
-        filename=log_file,
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s'
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(
+        logging.Formatter('%(asctime)s - %(levelname)s - %(file_name)s - %(message)s')
     )
+    setup_queue_logging(file_handler)
     print(f"Logging to: {log_file}")
@@ -1,22 +1,31 @@
 import pymupdf
-import json
+import orjson
 import os
+import asyncio
 from openai import AsyncOpenAI
 
-async def extract_text_and_tables_from_pdf(pdf_path: str) -> str:
-    doc = pymupdf.open(pdf_path)
-    all_content = ""
-    for page in doc:
-        text = page.get_text()
-        all_content += "TEXT:\n" + text + "\n"
-        
-        tables = page.find_tables()
-        for table in tables:
-            all_content += "TABLE:\n"
-            markdown = table.to_markdown()
-            all_content += markdown + "\n"
+from utils.cache_utils import write_json_file
+
+def extract_text_and_tables_from_pdf(pdf_path: str) -> str:
+    """
+    CPU-bound and blocking; async callers should run it in a worker thread
+    (asyncio.to_thread) so it doesn't stall the event loop.
+    """
+    # Collect parts and join once; repeated += copies the whole prompt each time
+    parts = []
+    with pymupdf.open(pdf_path) as doc:
+        for page in doc:
+            parts.append("TEXT:\n")
+            parts.append(page.get_text())
+            parts.append("\n")
+            
+            tables = page.find_tables()
+            for table in tables:
+                parts.append("TABLE:\n")
+                parts.append(table.to_markdown())
+                parts.append("\n")
     
-    return all_content
+    return "".join(parts)
 
 async def structure_panel_data(client: AsyncOpenAI, raw_content: str) -> dict:
     prompt = f"""
@@ -39,11 +48,11 @@ async def structure_panel_data(client: AsyncOpenAI, raw_content: str) -> dict:
         max_tokens=2000,
         response_format={"type": "json_object"}
     )
-    return json.loads(response.choices[0].message.content)
+    return orjson.loads(response.choices[0].message.content)
 
 async def process_pdf(pdf_path: str, output_folder: str, client: AsyncOpenAI):
     print(f"Processing PDF: {pdf_path}")
-    raw_content = await extract_text_and_tables_from_pdf(pdf_path)
+    raw_content = await asyncio.to_thread(extract_text_and_tables_from_pdf, pdf_path)
     
     structured_data = await structure_panel_data(client, raw_content)
     
@@ -51,8 +60,7 @@ async def process_pdf(pdf_path: str, output_folder: str, client: AsyncOpenAI):
     filename = f"{panel_name}_electric_panel.json"
     filepath = os.path.join(output_folder, filename)
     
-    with open(filepath, 'w') as f:
-        json.dump(structured_data, f, indent=2)
+    await write_json_file(filepath, structured_data)
     
     print(f"Saved structured panel data: {filepath}")
     return raw_content, structured_data
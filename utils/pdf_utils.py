@@ -14,12 +14,12 @@ def extract_text(file_path: str) -> str:
             logger.info(f"Successfully opened {file_path}")
             text = ""
             for i, page in enumerate(pdf.pages):
-                logger.info(f"Processing page {i+1} of {len(pdf.pages)}")
+                logger.info("Processing page %d of %d", i + 1, len(pdf.pages))
                 page_text = page.extract_text()
                 if page_text:
                     text += page_text + "\n"
                 else:
-                    logger.warning(f"No text extracted from page {i+1}")
+                    logger.warning("No text extracted from page %d", i + 1)
         
         if not text:
             logger.warning(f"No text extracted from {file_path}")